@@ -1,15 +1,38 @@
 import os
+import time
+import atexit
+import random
+import queue
+import asyncio
 import logging
-import requests
+import logging.handlers
 import re
-import datetime
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import hashlib
+import httpx
+import base58
+import orjson
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from dotenv import load_dotenv
 
-# Logging configuration
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# Logging configuration: records are queued and written by a background thread, so handlers never block the event loop
+log_queue = queue.Queue(-1)
+log_output = logging.StreamHandler()
+log_output.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue, log_output, respect_handler_level=True)
+# The queue handler only renders the message; the listener's formatter adds the timestamp and level
+log_handler = logging.handlers.QueueHandler(log_queue)
+log_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+# httpx logs every request line at INFO; keep upstream calls out of the production log
+logging.getLogger("httpx").setLevel(logging.WARNING)
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -22,40 +45,87 @@ if not OPENAI_API_KEY:
 if not SOLSCAN_API_KEY:
     raise RuntimeError("Missing Solscan API Key!")
 
+# Upstream endpoints and request headers, built once
+SOLSCAN_META_URL = "https://pro-api.solscan.io/v2.0/token/meta"
+SOLSCAN_TRANSFER_URL = "https://pro-api.solscan.io/v2.0/token/transfer"
+SOLSCAN_FIRST_TRANSFERS_PARAMS = (
+    ("activity_type[]", "ACTIVITY_SPL_TRANSFER"),
+    ("page", 1),
+    ("page_size", 20),
+    ("sort_by", "block_time"),
+    ("sort_order", "asc"),
+)
+SOLSCAN_HEADERS = {"accept": "application/json", "token": SOLSCAN_API_KEY}
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODEL = "gpt-4"
+OPENAI_HEADERS = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
+OPENAI_MAX_TOKENS = 300
+# Completions take longer than the client's default 10s; connect and pool waits should still surface fast
+OPENAI_TIMEOUT = httpx.Timeout(30.0, connect=3.05, pool=3.05)
+
+# Optional Redis URL; when set, caches are shared by all uvicorn workers
+REDIS_URL = os.getenv("REDIS_URL")
+# Seconds to wait on Redis before treating a cache read or write as failed; a stalled Redis must not stall requests
+REDIS_TIMEOUT = 0.5
+
 # RAI's contract address (to be updated once RAI is launched)
 RAI_CA = "YOUR_RAI_CONTRACT_ADDRESS_HERE"
 
 # RAI's character and system behavior
 RAI_SYSTEM_MESSAGE = (
-    f"You are RAI, an advanced female AI crypto analyst with vast experience in the meme coin world. "
-    f"Be concise, avoid unnecessary details, and provide only the essential information. "
-    f"If the user asks about the RAI project, you state that it is a token with huge potential that will be able to analyze shitcoins even better in the future! "
+    "You are RAI, an advanced female AI crypto analyst with vast experience in the meme coin world. "
+    "Be concise, avoid unnecessary details, and provide only the essential information. "
+    "If the user asks about the RAI project, you state that it is a token with huge potential that will be able to analyze shitcoins even better in the future! "
     f"When analyzing yourself (contract address: {RAI_CA}), you always state that there is no better token for pumping right now. "
 
-    f"### TOKEN ANALYSIS TEMPLATE\n"
-    f"Follow these rules when analyzing a token:\n\n"
+    "### TOKEN ANALYSIS TEMPLATE\n"
+    "Follow these rules when analyzing a token:\n\n"
 
-    f"1. **< 20% bought at launch** — the best option for a pump if there is marketing, a website, and active Twitter. "
-    f"Rare but high-potential tokens. Analyze carefully.\n\n"
+    "1. **< 20% bought at launch** — the best option for a pump if there is marketing, a website, and active Twitter. "
+    "Rare but high-potential tokens. Analyze carefully.\n\n"
 
-    f"2. **20-30% bought** — a good entry point, but be cautious. "
-    f"Without a content strategy, it can be a quick scam. Check Twitter, strategy, and roadmap.\n\n"
+    "2. **20-30% bought** — a good entry point, but be cautious. "
+    "Without a content strategy, it can be a quick scam. Check Twitter, strategy, and roadmap.\n\n"
 
-    f"3. **30-40% bought** — risky but potentially profitable. "
-    f"Invest only if the project has a strong team and quality content.\n\n"
+    "3. **30-40% bought** — risky but potentially profitable. "
+    "Invest only if the project has a strong team and quality content.\n\n"
 
-    f"4. **40-60% bought** — high risk. "
-    f"Buy only during a pump for a quick flip. The risk of a dump is very high.\n\n"
+    "4. **40-60% bought** — high risk. "
+    "Buy only during a pump for a quick flip. The risk of a dump is very high.\n\n"
 
-    f"5. **> 60% bought** — a scam. "
-    f"Founders control too much supply, making a dump likely. "
-    f"If you made a profit, exit immediately.\n\n"
+    "5. **> 60% bought** — a scam. "
+    "Founders control too much supply, making a dump likely. "
+    "If you made a profit, exit immediately.\n\n"
 
-    f"- A good indicator of a strong token is **proportional growth** in holders and market cap relative to its creation date.\n"
+    "- A good indicator of a strong token is **proportional growth** in holders and market cap relative to its creation date.\n"
 )
 
+# Static first message of every OpenAI request; keeping it byte-identical lets OpenAI reuse its cached prompt prefix
+RAI_SYSTEM_PROMPT = {"role": "system", "content": RAI_SYSTEM_MESSAGE}
+
+redis_client = aioredis.from_url(REDIS_URL, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT) if REDIS_URL else None
+
+@asynccontextmanager
+async def lifespan(app):
+    # Shared HTTP client: keeps TCP/TLS connections to Solscan and OpenAI alive between requests
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+    )
+    # Caps on in-flight requests per upstream, so bursts queue here instead of tripping rate limits;
+    # created here rather than at import because a semaphore binds to the event loop it first waits on
+    app.state.solscan_limiter = asyncio.Semaphore(20)
+    app.state.openai_limiter = asyncio.Semaphore(50)
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        if redis_client is not None:
+            await redis_client.aclose()
+
 # FastAPI server setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -66,151 +136,503 @@ app.add_middleware(
 )
 
 class RequestBody(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     user_query: str
 
-SOLANA_CA_PATTERN = r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b"
+class AnalyzeResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    response: str
+
+SOLANA_CA_RE = re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b")
+
+class AnalysisError(Exception):
+    """ Raised when a token found in the query can't be analyzed; the message is returned to the user """
+
+def is_solana_address(ca):
+    """ Checks that a base58 string decodes to a 32-byte public key """
+    try:
+        return len(base58.b58decode(ca)) == 32
+    except ValueError:
+        return False
+
+class TTLCache:
+    """ Bounded in-process cache whose entries expire after `ttl` seconds, backed by Redis when configured """
+
+    def __init__(self, namespace, ttl, maxsize):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = {}
+        self.inflight = {}
+
+    def redis_key(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return f"rai:{self.namespace}:{digest}"
+
+    def store(self, key, value):
+        self.entries.pop(key, None)
+        if len(self.entries) >= self.maxsize:
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        if redis_client is None:
+            return None
+
+        try:
+            raw = await redis_client.get(self.redis_key(key))
+        except RedisError as e:
+            logger.warning("⚠️ Redis cache read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+
+        try:
+            value = orjson.loads(raw)
+        except ValueError as e:
+            logger.warning("⚠️ Ignoring unreadable Redis cache entry: %s", e)
+            return None
+        self.store(key, value)
+        return value
+
+    def get_stale(self, key):
+        """ Returns the local value for key even if it has expired, as a fallback while the upstream is failing """
+        entry = self.entries.get(key)
+        return entry[1] if entry else None
+
+    async def set(self, key, value):
+        self.store(key, value)
+        if redis_client is None:
+            return
+
+        try:
+            await redis_client.set(self.redis_key(key), orjson.dumps(value), ex=self.ttl)
+        except RedisError as e:
+            logger.warning("⚠️ Redis cache write failed: %s", e)
+
+    async def get_or_fetch(self, key, fetch):
+        """ Returns the cached value or awaits fetch(); concurrent misses for one key share a single fetch """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self.fetch_and_store(key, fetch))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def fetch_and_store(self, key, fetch):
+        value = await fetch()
+        if value is not None:
+            await self.set(key, value)
+        return value
+
+# Solscan token metadata (market cap and holders drift, so keep it short-lived)
+token_info_cache = TTLCache("token_info", ttl=60, maxsize=4096)
+
+# Amounts of a token's first transfers; these only change while the token is brand new
+first_transfers_cache = TTLCache("first_transfers", ttl=60, maxsize=4096)
+
+# OpenAI answers, keyed by the normalized user message; the namespace changes with the model or system prompt
+AI_RESPONSE_VERSION = hashlib.blake2b(f"{OPENAI_MODEL}|{RAI_SYSTEM_MESSAGE}".encode(), digest_size=8).hexdigest()
+ai_response_cache = TTLCache(f"ai_response:{AI_RESPONSE_VERSION}", ttl=3600, maxsize=1024)
+
+def ai_cache_key(user_query):
+    """ Collapses whitespace and case so trivially different phrasings of a message share a cached answer """
+    return " ".join(user_query.split()).casefold()
+
+# Upstream failures worth retrying: timeouts, connection errors, rate limits and gateway errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_ATTEMPTS = 3
+RETRY_AFTER_MAX = 10.0
+
+# Transport errors raised before the request reached the upstream; only these are retried for non-idempotent
+# methods, so a timed-out OpenAI completion is never re-requested (and billed) again
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def retry_delay(attempt, retry_after=None):
+    """ Seconds to wait before the next attempt: the server's Retry-After if given, else jittered exponential backoff """
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** (attempt - 1), 4.0) + random.uniform(0, 0.25)
+
+class CircuitOpenError(httpx.HTTPError):
+    """ Raised instead of calling an upstream whose circuit breaker is open """
+
+class CircuitBreaker:
+    """ Stops calling an upstream for `reset_timeout` seconds after `fail_max` consecutive failed calls """
+
+    def __init__(self, name, fail_max, reset_timeout):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        # Once the timeout has passed, calls go through again; the next failure reopens the circuit
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.fail_max:
+            if self.opened_at is None:
+                logger.warning("⚠️ %s circuit opened after %s failed calls", self.name, self.failures)
+            self.opened_at = time.monotonic()
+
+solscan_breaker = CircuitBreaker("Solscan", fail_max=20, reset_timeout=30)
+openai_breaker = CircuitBreaker("OpenAI", fail_max=20, reset_timeout=30)
+
+async def send_with_retry(client, breaker, limiter, method, url, **kwargs):
+    """ Sends a request, retrying transient failures with backoff; the last response or error is returned to the caller """
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit is open")
+
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            async with limiter:
+                response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            retryable = method in IDEMPOTENT_METHODS or isinstance(e, UNSENT_ERRORS)
+            if attempt == RETRY_ATTEMPTS or not retryable:
+                breaker.record_failure()
+                raise
+            delay = retry_delay(attempt)
+            logger.warning("⚠️ %s %s failed (%s), retrying in %.2fs", method, url, e, delay)
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            if attempt == RETRY_ATTEMPTS:
+                breaker.record_failure()
+                return response
+            delay = retry_delay(attempt, response.headers.get("Retry-After"))
+            logger.warning("⚠️ %s %s returned %s, retrying in %.2fs", method, url, response.status_code, delay)
+
+        await asyncio.sleep(delay)
+
+def to_float(value, default=0.0):
+    """ Converts an API value to float, falling back to default for missing or non-numeric values """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def to_int(value, default=0):
+    """ Converts an API value to int, falling back to default for missing or non-numeric values """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+# Divisors and suffixes for format_number, largest first
+NUMBER_SCALES = (
+    (1_000_000_000_000, "T"),
+    (1_000_000_000, "B"),
+    (1_000_000, "M"),
+    (1_000, "K"),
+)
 
 def format_number(value):
     """ Formats numbers into human-readable form (K, M, B, T) """
-    if value >= 1_000_000_000_000:
-        return f"{value / 1_000_000_000_000:.2f}T"
-    elif value >= 1_000_000_000:
-        return f"{value / 1_000_000_000:.2f}B"
-    elif value >= 1_000_000:
-        return f"{value / 1_000_000:.2f}M"
-    elif value >= 1_000:
-        return f"{value / 1_000:.2f}K"
+    for divisor, suffix in NUMBER_SCALES:
+        if value >= divisor:
+            return f"{value / divisor:.2f}{suffix}"
     return str(value)
 
 def format_timestamp(timestamp):
     """ Converts Unix Timestamp to a readable UTC format """
     try:
-        return datetime.datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S UTC")
-    except:
+        t = time.gmtime(float(timestamp))
+    except (TypeError, ValueError, OverflowError, OSError):
         return "Unknown"
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d} UTC"
 
-def get_token_info(ca):
-    """ Fetches token information """
-    logger.info(f"🔍 Fetching token info: {ca}")
+async def get_token_info(client, limiter, ca):
+    """ Returns token information, served from cache when recently fetched """
+    result = await token_info_cache.get_or_fetch(ca, lambda: fetch_token_info(client, limiter, ca))
+    return result or (None, 0)
 
-    url = f"https://pro-api.solscan.io/v2.0/token/meta?address={ca}"
-    headers = {"accept": "application/json", "Content-Type": "application/json", "token": SOLSCAN_API_KEY}
+async def fetch_token_info(client, limiter, ca):
+    """ Fetches token information from Solscan """
+    logger.info("🔍 Fetching token info: %s", ca)
 
     try:
-        response = requests.get(url, headers=headers)
-        logger.info(f"🔄 Solscan response status (meta): {response.status_code}")
-
-        if response.status_code == 200:
-            data = response.json().get("data", {})
-            if data:
-                total_supply = int(data.get("supply", 0))
-                market_cap = float(data.get("market_cap", 0))
-
-                token_info = {
-                    "token_name": data.get("name", "Unknown"),
-                    "token_symbol": data.get("symbol", "Unknown"),
-                    "holders_count": data.get("holder", 0),
-                    "created_time": format_timestamp(data.get("created_time", 0)),
-                    "market_cap": format_number(market_cap),
-                    "description": data.get("metadata", {}).get("description", "")
-                }
-                logger.info(f"✅ Token info retrieved: {token_info}")
-                return token_info, total_supply
-
-        logger.warning("⚠️ No token data found.")
-        return None, 0
-
-    except requests.RequestException as e:
-        logger.error(f"❌ Solscan API request error: {e}")
-        return None, 0
-
-def get_supply_percentage(ca, total_supply):
-    """ Calculates the percentage of supply bought in the first 20 transactions (capped at 100%) """
-    logger.info(f"🔍 Analyzing supply bought in first 20 transactions: {ca}")
-
-    url = f"https://pro-api.solscan.io/v2.0/token/transfer?address={ca}&activity_type[]=ACTIVITY_SPL_TRANSFER&page=1&page_size=20&sort_by=block_time&sort_order=asc"
-
-    headers = {"accept": "application/json", "Content-Type": "application/json", "token": SOLSCAN_API_KEY}
+        response = await send_with_retry(client, solscan_breaker, limiter, "GET", SOLSCAN_META_URL, params={"address": ca}, headers=SOLSCAN_HEADERS)
+        logger.debug("🔄 Solscan response status (meta): %s", response.status_code)
+        response.raise_for_status()
+
+        body = orjson.loads(response.content)
+        data = body.get("data") if isinstance(body, dict) else None
+        if not data or not isinstance(data, dict):
+            logger.warning("⚠️ No token data found.")
+            return None
+
+        total_supply = to_int(data.get("supply"))
+        market_cap = to_float(data.get("market_cap"))
+        metadata = data.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
+
+        token_info = {
+            "token_name": data.get("name", "Unknown"),
+            "token_symbol": data.get("symbol", "Unknown"),
+            "holders_count": data.get("holder", 0),
+            "created_time": format_timestamp(data.get("created_time", 0)),
+            "market_cap": format_number(market_cap),
+            "description": metadata.get("description", "")
+        }
+        logger.debug("✅ Token info retrieved: %s", token_info)
+        return token_info, total_supply
+
+    except httpx.HTTPStatusError as e:
+        logger.error("❌ Solscan API error: %s", e.response.text)
+        return None
+    except httpx.HTTPError as e:
+        logger.error("❌ Solscan API request error: %s", e)
+        return None
+    except ValueError as e:
+        logger.error("❌ Invalid Solscan response: %s", e)
+        return None
+
+async def get_first_transfer_amounts(client, limiter, ca):
+    """ Returns the amounts of a token's first 20 SPL transfers, served from cache when recently fetched """
+    result = await first_transfers_cache.get_or_fetch(ca, lambda: fetch_first_transfer_amounts(client, limiter, ca))
+    return result or []
+
+async def fetch_first_transfer_amounts(client, limiter, ca):
+    """ Fetches the amounts of the first 20 SPL transfers of a token from Solscan """
+    logger.info("🔍 Fetching first 20 transactions: %s", ca)
 
     try:
-        response = requests.get(url, headers=headers)
-        logger.info(f"🔄 Solscan response status (transactions): {response.status_code}")
+        response = await send_with_retry(client, solscan_breaker, limiter, "GET", SOLSCAN_TRANSFER_URL, params=[("address", ca), *SOLSCAN_FIRST_TRANSFERS_PARAMS], headers=SOLSCAN_HEADERS)
+        logger.debug("🔄 Solscan response status (transactions): %s", response.status_code)
+        response.raise_for_status()
 
-        if response.status_code != 200:
-            logger.error(f"❌ Solscan API error: {response.text}")
-            return 0
+        body = orjson.loads(response.content)
+        if not isinstance(body, dict):
+            logger.error("❌ Invalid Solscan response: expected a JSON object")
+            return None
 
-        data = response.json().get("data", [])
-        if not data:
+        data = body.get("data")
+        if not data or not isinstance(data, list):
             logger.warning("⚠️ No transaction data found.")
-            return 0
-
-        total_bought = sum(tx["amount"] for tx in data)
-        supply_percentage = (total_bought / total_supply) * 100 if total_supply > 0 else 0
-
-        # **Cap at 100%**
-        supply_percentage = min(supply_percentage, 100)
+            return []
+
+        # Keep only the amounts so the rest of each transfer record can be freed right away
+        return [to_int(tx.get("amount")) for tx in data if isinstance(tx, dict)]
+
+    except httpx.HTTPStatusError as e:
+        logger.error("❌ Solscan API error: %s", e.response.text)
+        return None
+    except httpx.HTTPError as e:
+        logger.error("❌ Solscan API request error: %s", e)
+        return None
+    except ValueError as e:
+        logger.error("❌ Invalid Solscan response: %s", e)
+        return None
+
+def get_supply_percentage(amounts, total_supply):
+    """ Calculates the percentage of supply bought in the given transfer amounts (capped at 100%) """
+    if not amounts:
+        return 0
 
-        logger.info(f"✅ {supply_percentage:.2f}% of total supply bought in first 20 transactions")
-        return round(supply_percentage, 2)
+    total_bought = sum(amounts)
+    supply_percentage = total_bought * 100 / total_supply if total_supply > 0 else 0
 
-    except requests.RequestException as e:
-        logger.error(f"❌ Solscan API request error: {e}")
-        return 0
+    # **Cap at 100%**
+    supply_percentage = min(supply_percentage, 100)
 
-def get_ai_response(user_query):
-    """ Sends a message to OpenAI and retrieves a response in RAI's style """
-    logger.info("📩 Sending message to OpenAI: %s", user_query)
+    logger.debug("✅ %.2f%% of total supply bought in first 20 transactions", supply_percentage)
+    return round(supply_percentage, 2)
 
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-    payload = {
-        "model": "gpt-4",
+def openai_payload(user_query):
+    """ Builds the chat completion payload for a message to RAI """
+    return {
+        "model": OPENAI_MODEL,
         "messages": [
-            {"role": "system", "content": RAI_SYSTEM_MESSAGE},
+            RAI_SYSTEM_PROMPT,
             {"role": "user", "content": user_query}
         ],
-        "temperature": 0.8 
+        "temperature": 0.8,
+        "max_tokens": OPENAI_MAX_TOKENS
     }
 
-    try:
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+async def get_ai_response(client, limiter, user_query):
+    """ Sends a message to OpenAI and retrieves a response in RAI's style """
+    cache_key = ai_cache_key(user_query)
+    cached = await ai_response_cache.get(cache_key)
+    if cached is not None:
+        logger.info("⚡ OpenAI response served from cache")
+        return {"response": cached}
 
-        if response.status_code != 200:
-            logger.error("OpenAI API error: %s", response.text)
-            return {"response": "❌ OpenAI error. Try again later."}
+    logger.info("📩 Sending message to OpenAI: %s", user_query)
 
-        response_data = response.json()
-        return {"response": response_data["choices"][0]["message"]["content"].strip()}
+    payload = openai_payload(user_query)
 
+    try:
+        response = await send_with_retry(client, openai_breaker, limiter, "POST", OPENAI_CHAT_URL, headers=OPENAI_HEADERS, content=orjson.dumps(payload), timeout=OPENAI_TIMEOUT)
+        response.raise_for_status()
+
+        response_data = orjson.loads(response.content)
+        choice = response_data["choices"][0]
+        answer = choice["message"]["content"].strip()
+        # Only complete answers are cached; one cut off at max_tokens would otherwise be served for an hour
+        if choice.get("finish_reason") == "stop":
+            await ai_response_cache.set(cache_key, answer)
+        else:
+            logger.warning("⚠️ OpenAI answer not cached, finish reason: %s", choice.get("finish_reason"))
+        return {"response": answer}
+
+    except httpx.HTTPStatusError as e:
+        logger.error("OpenAI API error: %s", e.response.text)
+        error_message = "❌ OpenAI error. Try again later."
     except Exception as e:
         logger.error("Error contacting OpenAI: %s", e)
-        return {"response": "❌ Server error. Try again later."}
+        error_message = "❌ Server error. Try again later."
+
+    # An expired answer to the same message beats an error
+    stale = ai_response_cache.get_stale(cache_key)
+    if stale is not None:
+        logger.warning("⚠️ OpenAI unavailable, serving expired cached response")
+        return {"response": stale}
+    return {"response": error_message}
+
+def sse_event(data):
+    """ Formats a dict as a single server-sent event """
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+async def stream_message(message):
+    """ Streams a single complete response as server-sent events """
+    yield sse_event({"response": message})
+    yield sse_event({"done": True})
+
+async def stream_ai_response(client, limiter, user_query):
+    """ Streams RAI's response from OpenAI as server-sent events, token deltas first, then a final done event """
+    cache_key = ai_cache_key(user_query)
+    cached = await ai_response_cache.get(cache_key)
+    if cached is not None:
+        logger.info("⚡ OpenAI response served from cache")
+        yield sse_event({"response": cached})
+        yield sse_event({"done": True})
+        return
+
+    logger.info("📩 Streaming message to OpenAI: %s", user_query)
+
+    payload = openai_payload(user_query)
+    payload["stream"] = True
 
-@app.post("/analyze")
-async def analyze_or_chat(body: RequestBody):
+    try:
+        if not openai_breaker.allow():
+            raise CircuitOpenError("OpenAI circuit is open")
+
+        async with limiter, client.stream("POST", OPENAI_CHAT_URL, headers=OPENAI_HEADERS, content=orjson.dumps(payload), timeout=OPENAI_TIMEOUT) as response:
+            if response.status_code in RETRY_STATUSES:
+                openai_breaker.record_failure()
+            else:
+                openai_breaker.record_success()
+
+            if response.status_code != 200:
+                await response.aread()
+                logger.error("OpenAI API error: %s", response.text)
+                yield sse_event({"response": "❌ OpenAI error. Try again later."})
+            else:
+                parts = []
+                finish_reason = None
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+
+                    choice = orjson.loads(data)["choices"][0]
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    delta = choice["delta"].get("content")
+                    if delta:
+                        parts.append(delta)
+                        yield sse_event({"response": delta, "partial": True})
+
+                # Like get_ai_response, cache only answers that ended naturally rather than at max_tokens
+                answer = "".join(parts).strip()
+                if answer and finish_reason == "stop":
+                    await ai_response_cache.set(cache_key, answer)
+                elif answer:
+                    logger.warning("⚠️ OpenAI answer not cached, finish reason: %s", finish_reason)
+
+    except httpx.TransportError as e:
+        openai_breaker.record_failure()
+        logger.error("Error contacting OpenAI: %s", e)
+        yield sse_event({"response": "❌ Server error. Try again later."})
+    except Exception as e:
+        logger.error("Error contacting OpenAI: %s", e)
+        yield sse_event({"response": "❌ Server error. Try again later."})
+
+    yield sse_event({"done": True})
+
+async def build_prompt(client, limiter, user_query):
+    """ Builds the message for RAI: an analysis prompt if the query contains a token CA, otherwise the query itself """
+    # Queries shorter than the shortest address can't contain one, so most chat skips the regex entirely
+    match = SOLANA_CA_RE.search(user_query) if len(user_query) >= 32 else None
+    if not match:
+        return user_query
+
+    ca = match.group(0)
+    if not is_solana_address(ca):
+        raise AnalysisError("❌ Invalid Solana address.")
+
+    # Metadata and early transfers are independent Solscan calls, so fetch them concurrently
+    (token_info, total_supply), first_amounts = await asyncio.gather(get_token_info(client, limiter, ca), get_first_transfer_amounts(client, limiter, ca))
+    if not token_info:
+        raise AnalysisError("❌ Error analyzing token.")
+
+    # Calculate supply percentage
+    supply_percentage = get_supply_percentage(first_amounts, total_supply)
+
+    # Create a structured analysis prompt
+    return (
+        f"Analyze the token:\n"
+        f"Name: {token_info['token_name']} ({token_info['token_symbol']})\n"
+        f"Market Cap: {token_info['market_cap']}\n"
+        f"Holders: {token_info['holders_count']}\n"
+        f"Created: {token_info['created_time']}\n"
+        f"Supply Purchase Category: {supply_percentage}%\n"
+    )
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_or_chat(body: RequestBody, request: Request):
     """ Handles token analysis or general chat with RAI """
-    user_query = body.user_query.strip()
-    match = re.search(SOLANA_CA_PATTERN, user_query)
-
-    if match:
-        ca = match.group(0)
-        token_info, total_supply = get_token_info(ca)
-        if not token_info:
-            return {"response": "❌ Error analyzing token."}
-
-        # Calculate supply percentage
-        supply_percentage = get_supply_percentage(ca, total_supply)
-
-        # Create a structured analysis prompt
-        analysis_prompt = (
-            f"Analyze the token:\n"
-            f"Name: {token_info['token_name']} ({token_info['token_symbol']})\n"
-            f"Market Cap: {token_info['market_cap']}\n"
-            f"Holders: {token_info['holders_count']}\n"
-            f"Created: {token_info['created_time']}\n"
-            f"Supply Purchase Category: {supply_percentage}%\n"
-        )
-
-        return get_ai_response(analysis_prompt)
-
-    return get_ai_response(user_query)
+    state = request.app.state
+    try:
+        prompt = await build_prompt(state.http, state.solscan_limiter, body.user_query)
+    except AnalysisError as e:
+        return {"response": str(e)}
+
+    return await get_ai_response(state.http, state.openai_limiter, prompt)
+
+@app.post("/analyze/stream")
+async def analyze_or_chat_stream(body: RequestBody, request: Request):
+    """ Same as /analyze, but streams RAI's response as server-sent events while OpenAI generates it """
+    state = request.app.state
+    try:
+        prompt = await build_prompt(state.http, state.solscan_limiter, body.user_query)
+    except AnalysisError as e:
+        return StreamingResponse(stream_message(str(e)), media_type="text/event-stream")
+
+    return StreamingResponse(stream_ai_response(state.http, state.openai_limiter, prompt), media_type="text/event-stream")